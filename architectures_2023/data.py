@@ -1,13 +1,17 @@
 import json
 import logging
-from dataclasses import dataclass
-from enum import StrEnum
-from functools import partial
+import operator as op
+import re
+from dataclasses import dataclass, field
+from enum import IntEnum, StrEnum
+from functools import cached_property, partial
 from pathlib import Path
 from typing import Any, Callable
 
+import numpy as np
 import pandas as pd
 import tomllib
+from numpy.typing import NDArray
 
 
 class STATUS_FLAG(StrEnum):
@@ -18,14 +22,69 @@ class STATUS_FLAG(StrEnum):
     R_DISPOSITION_RELATED = r"^R.*"
 
 
+# KeplerData views whose rows are a subset of the multis, with the boolean mask over the
+# rows of the multis that selects each of them
+_MULTIS_SUBSET_MASKS: dict[str, Callable[[pd.DataFrame], NDArray[np.bool_]]] = {
+    "multis": lambda multis: np.ones(len(multis), dtype=bool),
+    "m2": lambda multis: multis["multiplicity"].to_numpy() == 2,
+    "m3": lambda multis: multis["multiplicity"].to_numpy() == 3,
+    "m3_plus": lambda multis: multis["multiplicity"].to_numpy() >= 3,
+    "innermost_multi": lambda multis: position_codes(multis) == POSITION.INNERMOST,
+    "middle_multi": lambda multis: position_codes(multis) == POSITION.MIDDLE,
+    "outermost_multi": lambda multis: position_codes(multis) == POSITION.OUTERMOST,
+}
+
+
+class POSITION(IntEnum):
+    """Enum for the position of a planet within its system. The values are the codes of the categorical position column."""
+
+    INNERMOST = 0
+    MIDDLE = 1
+    OUTERMOST = 2
+    SINGLE = 3
+    DEMOTED = 4
+
+
+POSITION_DTYPE = pd.CategoricalDtype([position.name.lower() for position in POSITION])
+
+
+# Status flag regexes compiled once for filter_data
+_STATUS_FLAG_REGEX = {flag: re.compile(flag) for flag in STATUS_FLAG}
+
+# Operators accepted by KeplerData.get_multis_system_with
+_COMPARISON_OPERATORS = {
+    "==": op.eq,
+    "!=": op.ne,
+    "<": op.lt,
+    "<=": op.le,
+    ">": op.gt,
+    ">=": op.ge,
+}
+
+
 @dataclass(frozen=True)
 class KeplerData:
-    """Class to hold the Kepler data and the configurations used for processing the raw data. Helper functions are provided for easy access to the data."""
+    """Class to hold the Kepler data and the configurations used for processing the raw data. Helper functions are provided for easy access to the data.
+
+    The derived views (all_candidates, m2, innermost_multi, ...) and the numpy arrays of the frequently used columns (singles_period, multis_radius, ...) are computed on first access and cached since the underlying dataframes are not expected to change.
+    """
 
     singles: pd.DataFrame
     multis: pd.DataFrame
     config: dict[str, Any] | None = None
     status_flag: STATUS_FLAG | None = None
+    _sorted_values: dict[tuple[str, str], NDArray] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _multis_by_multiplicity: dict[tuple[int, str], pd.DataFrame] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _multis_order: dict[str, NDArray[np.intp]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _multis_masks: dict[str, NDArray[np.bool_]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def __repr__(self):
         info = f"KeplerData(singles:{len(self.singles)}, multis:{len(self.multis)})\n"
@@ -35,42 +94,134 @@ class KeplerData:
 
         return info
 
-    @property
-    def all_candidates(self):
-        return (
-            pd.concat([self.singles, self.multis])
-            .reset_index(drop=True)
-            .sort_values(by=["system", "ttvperiod"])
+    @cached_property
+    def all_candidates(self) -> pd.DataFrame:
+        df = pd.concat([self.singles, self.multis]).reset_index(drop=True)
+
+        # singles and multis are each sorted by system and period so a stable sort on
+        # the system only has to merge the two sorted runs
+        merged = df.iloc[np.argsort(df["system"].to_numpy(), kind="stable")]
+        if not _is_sorted_by_system_and_period(merged):
+            merged = df.sort_values(by=["system", "ttvperiod"])
+
+        return merged
+
+    @cached_property
+    def singles_period(self) -> NDArray[np.float64]:
+        return self.singles["ttvperiod"].to_numpy()
+
+    @cached_property
+    def multis_period(self) -> NDArray[np.float64]:
+        return self.multis["ttvperiod"].to_numpy()
+
+    @cached_property
+    def singles_radius(self) -> NDArray[np.float64]:
+        return self.singles["radius"].to_numpy()
+
+    @cached_property
+    def multis_radius(self) -> NDArray[np.float64]:
+        return self.multis["radius"].to_numpy()
+
+    @cached_property
+    def multis_by_system(self) -> pd.DataFrame:
+        """One row per system of multis with the weakest S/N (snr) and the Kepler magnitude of the host star (kepmag)."""
+        multis = self.multis
+        if not multis["system"].is_monotonic_increasing:
+            # a stable sort keeps the first planet of each system first
+            order = np.argsort(multis["system"].to_numpy(), kind="stable")
+            multis = multis.iloc[order]
+
+        # the planets of a system are contiguous so each system is a slice which can be
+        # reduced without hashing the system numbers like a groupby would
+        system = multis["system"].to_numpy()
+        first_of_system = np.flatnonzero(_system_boundaries(system)[0])
+
+        # fmin skips NaN like the groupby min does
+        return pd.DataFrame(
+            {
+                "snr": np.fmin.reduceat(multis["snr"].to_numpy(), first_of_system),
+                "kepmag": multis["kepmag"].to_numpy()[first_of_system],
+            },
+            index=pd.Index(system[first_of_system], name="system"),
         )
 
-    @property
+    @cached_property
     def m2(self) -> pd.DataFrame:
-        return self.get_multis_system_with(num_planets=2)
+        return self.multis[self._multis_mask("m2")]
 
-    @property
+    @cached_property
     def m3(self) -> pd.DataFrame:
-        return self.get_multis_system_with(num_planets=3)
+        return self.multis[self._multis_mask("m3")]
 
-    @property
+    @cached_property
     def m3_plus(self) -> pd.DataFrame:
-        return self.get_multis_system_with(num_planets=3, operator=">=")
+        return self.multis[self._multis_mask("m3_plus")]
 
-    @property
+    @cached_property
     def innermost_multi(self) -> pd.DataFrame:
-        return self.multis.query("position == 'innermost'")
+        return self.multis[self._multis_mask("innermost_multi")]
 
-    @property
+    @cached_property
     def outermost_multi(self) -> pd.DataFrame:
-        return self.multis.query("position == 'outermost'")
+        return self.multis[self._multis_mask("outermost_multi")]
 
-    @property
+    @cached_property
     def middle_multi(self) -> pd.DataFrame:
-        return self.multis.query("position == 'middle'")
+        return self.multis[self._multis_mask("middle_multi")]
+
+    def _multis_mask(self, subset: str) -> NDArray[np.bool_]:
+        """Returns the cached boolean mask over the rows of the multis selecting one of the subsets in _MULTIS_SUBSET_MASKS."""
+        if subset not in self._multis_masks:
+            self._multis_masks[subset] = _MULTIS_SUBSET_MASKS[subset](self.multis)
+
+        return self._multis_masks[subset]
 
     def get_multis_system_with(
         self, *, num_planets: int, operator: str = "=="
     ) -> pd.DataFrame:
-        return self.multis.query(f"multiplicity {operator} {num_planets}")
+        if (key := (num_planets, operator)) not in self._multis_by_multiplicity:
+            multiplicity = self.multis["multiplicity"].to_numpy()
+            self._multis_by_multiplicity[key] = self.multis[
+                _COMPARISON_OPERATORS[operator](multiplicity, num_planets)
+            ]
+
+        return self._multis_by_multiplicity[key]
+
+    def sorted_values(self, subset: str, column: str = "ttvperiod") -> NDArray:
+        """Returns the sorted values of a column of one of the dataframes (e.g. "singles", "m2"). The sorted array is cached so it can be shared by the statistics and the plots.
+
+        The subset is "singles", "all_candidates" or one of the subsets of the multis in _MULTIS_SUBSET_MASKS. The multis are sorted once per column and their subsets (m2, innermost_multi, ...) are picked out of that order with a positional mask instead of being sorted again.
+        """
+        if (key := (subset, column)) in self._sorted_values:
+            return self._sorted_values[key]
+
+        if subset in _MULTIS_SUBSET_MASKS:
+            if column not in self._multis_order:
+                self._multis_order[column] = np.argsort(self.multis[column].to_numpy())
+
+            # the positional mask of the subset picks its rows out of the sorted multis
+            order = self._multis_order[column]
+            in_subset = self._multis_mask(subset)
+
+            values = self.multis[column].to_numpy()[order[in_subset[order]]]
+        elif subset == "singles":
+            values = np.sort(self.singles[column].to_numpy())
+        elif subset == "all_candidates":
+            values = np.sort(self.all_candidates[column].to_numpy())
+        else:
+            raise ValueError(f"Unknown subset {subset!r}")
+
+        self._sorted_values[key] = values
+        return values
+
+    def subset(self, mask: Callable[[pd.DataFrame], Any]) -> "KeplerData":
+        """Returns a new KeplerData keeping only the singles and multis rows where mask(df) is True."""
+        return KeplerData(
+            self.singles[mask(self.singles)],
+            self.multis[mask(self.multis)],
+            self.config,
+            self.status_flag,
+        )
 
 
 def load_config(config_file_path: str = "") -> dict[str, Any]:
@@ -94,13 +245,21 @@ def load_config(config_file_path: str = "") -> dict[str, Any]:
         return config
 
 
-def load_data(data_path: str = "") -> tuple[pd.DataFrame, str]:
+def load_data(
+    data_path: str = "",
+    use_float32: bool = False,
+    columns: list[str] | None = None,
+) -> tuple[pd.DataFrame, str]:
     """Reads the latest CSV file and cleans the dataframe for analysis.
 
     Parameters:
     -----------
         data_path : str, optional
             Path to the CSV file. Loads the file with the latest date in its name from data/raw if no path is specified.
+        use_float32 : bool, optional
+            Store the float columns in single precision (see clean_data). Cached separately from the double precision data.
+        columns : list[str], optional
+            Only keep these columns of the cleaned dataframe. All columns are kept if not specified. The cache always holds every column.
 
     Returns:
     --------
@@ -116,18 +275,36 @@ def load_data(data_path: str = "") -> tuple[pd.DataFrame, str]:
         # max returns the latest file
         data_path = str(max(path.glob("*.csv")))
 
-    if (processed := root / "data" / "processed" / Path(data_path).name).exists():
-        logging.log(logging.INFO, f"Cached data found. Loading from {processed}")
-        df = pd.read_csv(processed)
+    # the cache is stored as parquet which preserves the column datatypes
+    processed = root / "data" / "processed" / Path(data_path).name
+    processed = processed.with_suffix(".parquet")
+    if use_float32:
+        processed = processed.with_stem(f"{processed.stem}_float32")
+
+    if processed.exists():
+        logging.log(logging.INFO, "Cached data found. Loading from %s", processed)
+        df = pd.read_parquet(processed, columns=columns)
+
+        # categoricals with integer categories (kic) are read back as integers
+        df = df.astype(
+            {
+                column: datatype
+                for column, datatype in COLUMN_DATATYPE.items()
+                if datatype == "category" and column in df.columns
+            }
+        )
         return df, str(processed)
 
-    logging.log(logging.INFO, f"Loading data from {data_path}")
-    df = pd.read_csv(data_path)
-    df = clean_data(df)
+    logging.log(logging.INFO, "Loading data from %s", data_path)
+    df = _read_csv(data_path)
+    df = clean_data(df, use_float32=use_float32)
 
     # cache the processed dataframe for future use
-    logging.log(logging.INFO, f"Caching processed data to {processed}")
-    df.to_csv(processed, index=False)
+    logging.log(logging.INFO, "Caching processed data to %s", processed)
+    df.to_parquet(processed, compression="zstd", index=False)
+
+    if columns is not None:
+        df = df[columns]
 
     return df, data_path
 
@@ -155,10 +332,11 @@ def process_data(
         KeplerData
             Instance of KeplerData containing the singles and multis dataframes.
     """
-    logging.log(
-        logging.INFO,
-        f"Config:\n{json.dumps(config | {'status_flag': status_flag}, indent=3)}",
-    )
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        logging.log(
+            logging.INFO,
+            f"Config:\n{json.dumps(config | {'status_flag': status_flag}, indent=3)}",
+        )
 
     fn = partial(filter_data, status_flag=status_flag, **config["data_filtering"])
 
@@ -199,16 +377,69 @@ def filter_data(
         pd.DataFrame
             Filtered dataframe.
     """
+    # combine the conditions into a single mask so the dataframe is only copied once
+    mask = np.ones(len(df), dtype=bool)
+
     if status_flag is not None:
-        df = df.loc[df["statusflag"].str.match(status_flag)]
+        pattern = _STATUS_FLAG_REGEX.get(status_flag) or re.compile(status_flag)
+        mask &= str_match(df["statusflag"], pattern)
 
     if min_ttvperiod is not None:
-        df = df.loc[df["ttvperiod"] >= min_ttvperiod]
+        mask &= df["ttvperiod"].to_numpy() >= min_ttvperiod
 
     if min_snr is not None:
-        df = df.loc[df["snr"] >= min_snr]
+        mask &= df["snr"].to_numpy() >= min_snr
 
-    return df.reset_index(drop=True)
+    return df.loc[mask].reset_index(drop=True)
+
+
+def str_match(series: pd.Series, pattern: re.Pattern[str]) -> NDArray[np.bool_]:
+    """Vectorized equivalent of series.str.match(pattern) returning a boolean numpy array. Missing values never match.
+
+    The pattern is only matched against the unique values of the series (the categories of a categorical series) and the result is mapped back to the rows through the codes, so the regex runs a handful of times instead of once per row.
+
+    Parameters:
+    -----------
+        series : pd.Series
+            String or categorical series to match.
+        pattern : re.Pattern[str]
+            Compiled regex matched from the start of each value.
+
+    Returns:
+    --------
+        NDArray[np.bool_]
+            Mask of the rows matching the pattern.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, values = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+
+    matches = np.fromiter(
+        (isinstance(v, str) and pattern.match(v) is not None for v in values),
+        dtype=bool,
+        count=len(values),
+    )
+
+    # missing values have the code -1 which picks up the trailing False
+    return np.append(matches, False)[codes]
+
+
+def position_codes(df: pd.DataFrame) -> NDArray[np.int8]:
+    """Returns the position of each planet as its POSITION code so the position can be compared as small integers rather than strings.
+
+    Parameters:
+    -----------
+        df : pd.DataFrame
+            Dataframe with a position column.
+
+    Returns:
+    --------
+        NDArray[np.int8]
+            POSITION code of each row. Rows without a position have the code -1.
+    """
+    # no-op unless the column lost its categorical dtype (e.g. after a concat of mixed dtypes)
+    return df["position"].astype(POSITION_DTYPE).cat.codes.to_numpy()
 
 
 def get_multis_and_singles(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -225,10 +456,17 @@ def get_multis_and_singles(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame
             Dataframes with single-planet and multi-planet systems.
     """
 
-    multis_mask = df["system"].duplicated(keep=False)
-    multis = df.loc[multis_mask].reset_index(drop=True)
+    system = df["system"]
+    if system.is_monotonic_increasing:
+        # planets of a system are contiguous, so a planet is in a multi if it is not
+        # both the first and the last row of its system
+        first_of_system, last_of_system = _system_boundaries(system.to_numpy())
+        multis_mask = ~(first_of_system & last_of_system)
+    else:
+        multis_mask = system.duplicated(keep=False).to_numpy()
 
-    singles = df.drop(df[multis_mask].index).reset_index(drop=True)
+    multis = df.loc[multis_mask].reset_index(drop=True)
+    singles = df.loc[~multis_mask].reset_index(drop=True)
 
     return singles, multis
 
@@ -254,7 +492,10 @@ def demote_multis_to_singles(
 
     new_singles, multis = get_multis_and_singles(multis)
 
-    new_singles["position"] = "demoted"
+    new_singles["position"] = pd.Categorical.from_codes(
+        np.full(len(new_singles), POSITION.DEMOTED, dtype=np.int8),
+        dtype=POSITION_DTYPE,
+    )
     singles = (
         pd.concat([singles, new_singles])
         .sort_values(by=["system"])
@@ -265,6 +506,44 @@ def demote_multis_to_singles(
     return singles, multis
 
 
+# Integer part of a KOI number, with or without the K prefix
+_KOI_SYSTEM = re.compile(r"^K?(\d+)")
+
+# Characters removed from or replaced by underscores in the column names
+_REMOVED_CHARACTERS = re.compile(r"[()\[\]:?']")
+_SEPARATORS = re.compile(r"[ /\-.,&]")
+_REPEATED_UNDERSCORES = re.compile(r"_{2,}")
+
+
+def _read_csv(data_path: str) -> pd.DataFrame:
+    """Reads the raw catalog CSV, parsing the columns directly into their COLUMN_DATATYPE where possible so that clean_data does not have to convert them.
+
+    Parameters:
+    -----------
+        data_path : str
+            Path to the CSV file.
+
+    Returns:
+    --------
+        pd.DataFrame
+            Dataframe with the original column names.
+    """
+    # map the raw column names to their cleaned names to look up the datatypes
+    header = pd.read_csv(data_path, nrows=0).columns
+    names = _clean_column_names(pd.DataFrame(columns=header)).columns
+
+    # columns with missing values are filled in clean_data before they are converted
+    # and koi is parsed as a number before being converted to a string
+    dtype = {
+        raw_name: COLUMN_DATATYPE[name]
+        for raw_name, name in zip(header, names)
+        if name in COLUMN_DATATYPE and name not in (*NAN_COLUMN_FIX, "koi")
+    }
+
+    # the pyarrow engine parses the CSV with multiple threads
+    return pd.read_csv(data_path, engine="pyarrow", dtype=dtype)
+
+
 def _clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     """Converts pandas dataframe columns to lowercase, replaces spaces with underscores and removes special characters.
 
@@ -278,24 +557,12 @@ def _clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame
             Dataframe with column names cleaned up.
     """
-    df.columns = (
-        df.columns.str.lower()
-        .str.replace(" ", "_")
-        .str.replace("(", "")
-        .str.replace(")", "")
-        .str.replace("[", "")
-        .str.replace("]", "")
-        .str.replace(":", "")
-        .str.replace("?", "")
-        .str.replace("'", "")
-        .str.replace("/", "_")
-        .str.replace("-", "_")
-        .str.replace(".", "_")
-        .str.replace(",", "_")
-        .str.replace("&", "_")
-        .str.replace("__", "_")
-        .str.replace("__", "_")
-    )
+    df.columns = [
+        _REPEATED_UNDERSCORES.sub(
+            "_", _SEPARATORS.sub("_", _REMOVED_CHARACTERS.sub("", column.lower()))
+        )
+        for column in df.columns
+    ]
 
     # Convert names from the published catalog to the older names from the internal catalog
     df = df.rename(
@@ -314,7 +581,7 @@ def _filter_then_split(
     filterer: Callable[[pd.DataFrame], pd.DataFrame],
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     df = filterer(df)
-    df["multiplicity"] = df.groupby("system")["koi"].transform("count")
+    df["multiplicity"] = _count_multiplicity(df)
     return get_multis_and_singles(df)
 
 
@@ -322,11 +589,28 @@ def _split_then_filter(
     df: pd.DataFrame,
     filterer: Callable[[pd.DataFrame], pd.DataFrame],
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
-    df["multiplicity"] = df.groupby("system")["koi"].transform("count")
+    df["multiplicity"] = _count_multiplicity(df)
     singles, multis = map(filterer, get_multis_and_singles(df))
     return singles, multis
 
 
+def _count_multiplicity(df: pd.DataFrame) -> pd.Series:
+    """Counts the number of planets in the system of each planet.
+
+    Parameters:
+    -----------
+        df : pd.DataFrame
+            Dataframe with a system column.
+
+    Returns:
+    --------
+        pd.Series
+            Number of planets in the system of each row.
+    """
+    # a single counting pass mapped back onto the rows is cheaper than groupby transform
+    return df["system"].map(df["system"].value_counts(sort=False))
+
+
 def _label_position(df: pd.DataFrame) -> pd.DataFrame:
     """Labels the planets in the dataframe as innermost, outermost or middle. Single-planet systems are labeled as single.
 
@@ -341,29 +625,77 @@ def _label_position(df: pd.DataFrame) -> pd.DataFrame:
             Labeled dataframe.
     """
 
+    # Planets of a system are contiguous and sorted by period after clean_data, so the
+    # innermost/outermost planets are the first/last rows of each system
+    if not _is_sorted_by_system_and_period(df):
+        df = df.sort_values(by=["system", "ttvperiod"]).reset_index(drop=True)
+
+    first_of_system, last_of_system = _system_boundaries(df["system"].to_numpy())
+
     # Label all planets as middle first
-    df["position"] = "middle"
+    position = np.full(len(df), POSITION.MIDDLE, dtype=np.int8)
 
     # Then label the innermost and outermost planets
-    df.loc[df.groupby("system")["ttvperiod"].idxmin(), "position"] = "innermost"
-    df.loc[df.groupby("system")["ttvperiod"].idxmax(), "position"] = "outermost"
+    position[first_of_system] = POSITION.INNERMOST
+    position[last_of_system] = POSITION.OUTERMOST
 
     # Single-planet systems are labeled as single
-    df.loc[~df["system"].duplicated(keep=False), "position"] = "single"
+    position[first_of_system & last_of_system] = POSITION.SINGLE
 
-    # Change to categorical type
-    df["position"] = df["position"].astype("category")
+    # Build the categorical directly from the codes
+    df["position"] = pd.Categorical.from_codes(position, dtype=POSITION_DTYPE)
 
     return df
 
 
-def _convert_column_datatypes(df: pd.DataFrame) -> pd.DataFrame:
+def _system_boundaries(
+    system: NDArray[np.integer],
+) -> tuple[NDArray[np.bool_], NDArray[np.bool_]]:
+    """Flags the first and last rows of each system. The rows of a system must be contiguous.
+
+    Parameters:
+    -----------
+        system : NDArray[np.integer]
+            System number of each row.
+
+    Returns:
+    --------
+        tuple[NDArray[np.bool_], NDArray[np.bool_]]
+            Masks of the first and last rows of each system.
+    """
+    new_system = system[1:] != system[:-1]
+
+    first_of_system = np.ones(len(system), dtype=bool)
+    first_of_system[1:] = new_system
+
+    last_of_system = np.ones(len(system), dtype=bool)
+    last_of_system[:-1] = new_system
+
+    return first_of_system, last_of_system
+
+
+def _is_sorted_by_system_and_period(df: pd.DataFrame) -> bool:
+    system = df["system"].to_numpy()
+    period = df["ttvperiod"].to_numpy()
+
+    same_system = system[1:] == system[:-1]
+    return bool(
+        (system[1:] >= system[:-1]).all()
+        and (period[1:][same_system] >= period[:-1][same_system]).all()
+    )
+
+
+def _convert_column_datatypes(
+    df: pd.DataFrame, use_float32: bool = False
+) -> pd.DataFrame:
     """Converts the column data types to the ones specified in COLUMN_DATATYPE.
 
     Parameters:
     -----------
         df : pd.DataFrame
             Dataframe to convert.
+        use_float32 : bool, optional
+            Convert float64 columns to float32, except for the ones in FLOAT64_COLUMNS.
 
     Returns:
     --------
@@ -371,18 +703,25 @@ def _convert_column_datatypes(df: pd.DataFrame) -> pd.DataFrame:
             Converted dataframe.
     """
     for column, datatype in COLUMN_DATATYPE.items():
-        df[column] = df[column].astype(datatype)  # type: ignore
+        if use_float32 and datatype == "float64" and column not in FLOAT64_COLUMNS:
+            datatype = "float32"
+
+        # columns parsed with the right datatype by _read_csv are left untouched
+        if df[column].dtype != datatype:
+            df[column] = df[column].astype(datatype)  # type: ignore
 
     return df
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_data(df: pd.DataFrame, use_float32: bool = False) -> pd.DataFrame:
     """Cleans the column names and converts the column data types of the dataframe. Replace NaN values with 0 for the columns "chisqwttv" and "kepmag", and "" for the column "kepler_id".
 
     Parameters:
     -----------
         df : pd.DataFrame
             Dataframe to clean and convert.
+        use_float32 : bool, optional
+            Store the float columns in single precision to halve their memory footprint. The columns in FLOAT64_COLUMNS are kept in double precision.
 
     Returns:
     --------
@@ -391,17 +730,20 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     df = _clean_column_names(df)
 
-    nan_column_fix = {"kepler_id": "", "chisqwttv": 0, "kepmag": 0}
-    df = df.fillna(nan_column_fix)
+    df = df.fillna(NAN_COLUMN_FIX)
 
-    df = _convert_column_datatypes(df)
-    df["system"] = df["koi"].astype("float32").astype("int32")
+    df = _convert_column_datatypes(df, use_float32=use_float32)
+    # the system is the integer part of the KOI number e.g. 1.01 or K00001.01 -> 1
+    df["system"] = df["koi"].str.extract(_KOI_SYSTEM, expand=False).astype("int32")
 
     df = df.sort_values(by=["system", "ttvperiod"]).reset_index(drop=True)
 
     return df
 
 
+# Values used to fill in the missing values of the dataframe
+NAN_COLUMN_FIX = {"kepler_id": "", "chisqwttv": 0, "kepmag": 0}
+
 # Column datatypes for the dataframe
 COLUMN_DATATYPE = {
     "kic": "category",
@@ -468,3 +810,7 @@ COLUMN_DATATYPE = {
     "stellar_source": "int8",
     "statusflag": "category",
 }
+
+# Columns kept in double precision when the data is loaded with use_float32 as the
+# periods and epochs are quoted to more significant digits than float32 can hold
+FLOAT64_COLUMNS = ("ttvperiod", "epoch")
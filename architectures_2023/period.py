@@ -1,67 +1,92 @@
 import json
 import logging
+import re
 
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_pdf import PdfPages
+from numpy.typing import NDArray
 from scipy import stats
 
-from architectures_2023.data import KeplerData
+from architectures_2023.data import POSITION, KeplerData, position_codes, str_match
 from architectures_2023.visual import PLOT_FORMAT, cdf, save_figure
 
 __all__ = ["generate_figures"]
 
+# Regex search for:
+#    - First digit is 1 OR
+#    - Second digit is 1 or 2 OR
+#    - Third digit is 8 or 9
+# Matches are joined with a binary OR
+# Learn more at: https://regex101.com/r/4KjNjd/1
+TTV_REGEX = re.compile(r"t?1\d{2}|t?\d[12]\d|t?\d{2}[89]")
 
-def generate_figures(kepler: KeplerData) -> None:
+
+def generate_figures(kepler: KeplerData, *, pdf: PdfPages | None = None) -> None:
     logging.log(
-        logging.INFO, f"Generating statistics for period related data with {kepler}"
-    )
-    stat_info = {
-        "KS-Singles_vs_Multis": stats.ks_2samp(
-            kepler.singles["ttvperiod"], kepler.multis["ttvperiod"]
-        ),
-        "KS-M2_vs_M3+": stats.ks_2samp(
-            kepler.m2["ttvperiod"], kepler.m3_plus["ttvperiod"]
-        ),
-    }
-    logging.log(
-        logging.INFO,
-        json.dumps(stat_info, indent=4, default=str),
+        logging.INFO, "Generating statistics for period related data with %s", kepler
     )
+    # the statistics are only reported in the log so skip them if it would be dropped
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        # the sorted periods are cached on kepler and reused by the cdf plots
+        stat_info = {
+            "KS-Singles_vs_Multis": stats.ks_2samp(
+                kepler.sorted_values("singles"), kepler.sorted_values("multis")
+            ),
+            "KS-M2_vs_M3+": stats.ks_2samp(
+                kepler.sorted_values("m2"), kepler.sorted_values("m3_plus")
+            ),
+        }
+        logging.log(
+            logging.INFO,
+            json.dumps(stat_info, indent=4, default=str),
+        )
 
     logging.log(
-        logging.INFO, f"Generating figures for period related data with\n{kepler}"
+        logging.INFO, "Generating figures for period related data with\n%s", kepler
     )
     ax = plt.subplot()
 
-    cdf_population(ax, kepler)
-    cdf_singles_vs_multi_subsets(ax, kepler, x_scale="linear")
-    cdf_singles_vs_multi_subsets(ax, kepler, x_scale="log")
+    # the population and ttv flag figures are further restricted to only candidates
+    # with a minimum of 3 transits so the filter is shared between them
+    logging.log(logging.INFO, "Additional restriction: nttobs >= 3")
+    kepler_nttobs3 = kepler.subset(lambda df: df["nttobs"].to_numpy() >= 3)
+
+    cdf_population(ax, kepler_nttobs3, pdf=pdf)
+    cdf_singles_vs_multi_subsets(ax, kepler, x_scale="linear", pdf=pdf)
+    cdf_singles_vs_multi_subsets(ax, kepler, x_scale="log", pdf=pdf)
 
-    cdf_with_ttv_flag(ax, kepler, x_scale="linear")
-    cdf_with_ttv_flag(ax, kepler, x_scale="log")
+    # split once so both scales share the subsets and their sorted periods
+    kepler_w_ttv, kepler_wo_ttv = split_by_ttv_flag(kepler_nttobs3)
+    cdf_with_ttv_flag(ax, kepler_w_ttv, kepler_wo_ttv, x_scale="linear", pdf=pdf)
+    cdf_with_ttv_flag(ax, kepler_w_ttv, kepler_wo_ttv, x_scale="log", pdf=pdf)
 
-    fraction_of_transiting_companions(ax, kepler, large_planet_cutoff=5.0)
+    fraction_of_transiting_companions(ax, kepler, large_planet_cutoff=5.0, pdf=pdf)
 
 
 def cdf_singles_vs_multi_subsets(
-    ax: Axes, data: KeplerData, *, x_scale: str = "log"
+    ax: Axes, data: KeplerData, *, x_scale: str = "log", pdf: PdfPages | None = None
 ) -> None:
     cdf(
         ax,
-        data.singles["ttvperiod"],
+        data.sorted_values("singles"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["SINGLES"],
     )
     cdf(
         ax,
-        data.m2["ttvperiod"],
+        data.sorted_values("m2"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M2"],
     )
     cdf(
         ax,
-        data.m3_plus["ttvperiod"],
+        data.sorted_values("m3_plus"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M3_PLUS"],
     )
 
@@ -74,64 +99,67 @@ def cdf_singles_vs_multi_subsets(
     if x_scale == "log":
         ax.legend(loc="lower right")
 
-    save_figure(ax, f"period_cdf_singles_vs_multi_subsets_{x_scale}.pdf")
+    save_figure(ax, f"period_cdf_singles_vs_multi_subsets_{x_scale}.pdf", pdf=pdf)
 
 
-def cdf_population(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> None:
-    # we further restrict the data to only candidates with a minimum of 3 transits
-    logging.log(logging.INFO, f"Additional restriction: nttobs >= 3")
-    data = KeplerData(
-        data.singles.query("nttobs >= 3"),
-        data.multis.query("nttobs >= 3"),
-        status_flag=data.status_flag,
-    )
-
+def cdf_population(
+    ax: Axes, data: KeplerData, *, x_scale: str = "log", pdf: PdfPages | None = None
+) -> None:
+    # data is expected to be restricted to candidates with nttobs >= 3
     cdf(
         ax,
-        data.all_candidates["ttvperiod"],
+        data.sorted_values("all_candidates"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["ALL"],
     )
     cdf(
         ax,
-        data.singles["ttvperiod"],
+        data.sorted_values("singles"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["SINGLES"],
     )
     cdf(
         ax,
-        data.multis["ttvperiod"],
+        data.sorted_values("multis"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["MULTIS"],
     )
     cdf(
         ax,
-        data.m2["ttvperiod"],
+        data.sorted_values("m2"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M2"],
     )
     cdf(
         ax,
-        data.m3_plus["ttvperiod"],
+        data.sorted_values("m3_plus"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M3_PLUS"],
     )
     cdf(
         ax,
-        data.innermost_multi["ttvperiod"],
+        data.sorted_values("innermost_multi"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M_INNERMOST"],
     )
     cdf(
         ax,
-        data.middle_multi["ttvperiod"],
+        data.sorted_values("middle_multi"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M_MIDDLE"],
     )
     cdf(
         ax,
-        data.outermost_multi["ttvperiod"],
+        data.sorted_values("outermost_multi"),
         include_zero=(x_scale == "linear"),
+        presorted=True,
         **PLOT_FORMAT["M_OUTERMOST"],
     )
 
@@ -149,59 +177,95 @@ def cdf_population(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> None:
     ax.legend(handles[5:], labels[5:], loc="lower right", markerfirst=False)
     ax.add_artist(upper_left)
 
-    save_figure(ax, f"period_cdf_population_{x_scale}.pdf")
+    save_figure(ax, f"period_cdf_population_{x_scale}.pdf", pdf=pdf)
 
 
-def cdf_with_ttv_flag(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> None:
-    data = KeplerData(
-        data.singles.query("nttobs >= 3"),
-        data.multis.query("nttobs >= 3"),
-        status_flag=data.status_flag,
-    )
-    logging.log(
-        logging.INFO,
-        f"Additional restriction for data without ttvflag filter: nttobs >= 3",
-    )
+def split_by_ttv_flag(data: KeplerData) -> tuple[KeplerData, KeplerData]:
+    """Split the data into candidates with and without TTVs based on their ttvflag.
+
+    Parameters
+    ----------
+    data : KeplerData
+        The data to split; expected to be restricted to candidates with nttobs >= 3.
 
-    # Regex search for:
-    #    - First digit is 1 OR
-    #    - Second digit is 1 or 2 OR
-    #    - Third digit is 8 or 9
-    # Matches are joined with a binary OR
-    # Learn more at: https://regex101.com/r/4KjNjd/1
-    ttv_regex = r"t?1\d{2}|t?\d[12]\d|t?\d{2}[89]"
+    Returns
+    -------
+    tuple[KeplerData, KeplerData]
+        The candidates with and without TTVs.
+    """
+    singles_w_ttv = str_match(data.singles["ttvflag"], TTV_REGEX)
+    multis_w_ttv = str_match(data.multis["ttvflag"], TTV_REGEX)
     data_w_ttv = KeplerData(
-        data.singles.query("ttvflag.str.match(@ttv_regex)"),
-        data.multis.query("ttvflag.str.match(@ttv_regex)"),
+        data.singles[singles_w_ttv],
+        data.multis[multis_w_ttv],
         status_flag=data.status_flag,
     )
     data_wo_ttv = KeplerData(
-        data.singles.query("~ttvflag.str.match(@ttv_regex)"),
-        data.multis.query("~ttvflag.str.match(@ttv_regex)"),
+        data.singles[~singles_w_ttv],
+        data.multis[~multis_w_ttv],
         status_flag=data.status_flag,
     )
     logging.log(
         logging.INFO,
-        f"Additional restriction for data with ttvflag filter: "
-        f"nttobs >= 3 and ttvflag must match regex {ttv_regex}",
+        "Additional restriction for data with ttvflag filter: "
+        "nttobs >= 3 and ttvflag must match regex %s",
+        TTV_REGEX.pattern,
     )
 
+    return data_w_ttv, data_wo_ttv
+
+
+def cdf_with_ttv_flag(
+    ax: Axes,
+    data_w_ttv: KeplerData,
+    data_wo_ttv: KeplerData,
+    *,
+    x_scale: str = "log",
+    pdf: PdfPages | None = None,
+) -> None:
+    # data is expected to be restricted to candidates with nttobs >= 3 and split with
+    # split_by_ttv_flag
+
     # Some additional formatting for the plot is required here
     fmt = PLOT_FORMAT["SINGLES"].copy()
     fmt["label"] = f"{fmt['label']} w TTV"
-    cdf(ax, data_w_ttv.singles["ttvperiod"], include_zero=(x_scale == "linear"), **fmt)
+    cdf(
+        ax,
+        data_w_ttv.sorted_values("singles"),
+        include_zero=(x_scale == "linear"),
+        presorted=True,
+        **fmt,
+    )
 
     fmt["label"] = fmt["label"].replace("w", "w/o")
     fmt["linestyle"] = "dashed"
-    cdf(ax, data_wo_ttv.singles["ttvperiod"], include_zero=(x_scale == "linear"), **fmt)
+    cdf(
+        ax,
+        data_wo_ttv.sorted_values("singles"),
+        include_zero=(x_scale == "linear"),
+        presorted=True,
+        **fmt,
+    )
 
     fmt = PLOT_FORMAT["MULTIS"].copy()
     fmt["label"] = f"{fmt['label']} w TTV"
-    cdf(ax, data_w_ttv.multis["ttvperiod"], include_zero=(x_scale == "linear"), **fmt)
+    cdf(
+        ax,
+        data_w_ttv.sorted_values("multis"),
+        include_zero=(x_scale == "linear"),
+        presorted=True,
+        **fmt,
+    )
 
     fmt["label"] = fmt["label"].replace("w", "w/o")
     fmt["linestyle"] = "dashed"
-    cdf(ax, data_wo_ttv.multis["ttvperiod"], include_zero=(x_scale == "linear"), **fmt)
+    cdf(
+        ax,
+        data_wo_ttv.sorted_values("multis"),
+        include_zero=(x_scale == "linear"),
+        presorted=True,
+        **fmt,
+    )
 
     ax.set_xscale(x_scale)  # type: ignore
     if x_scale == "linear":
@@ -212,11 +276,15 @@ def cdf_with_ttv_flag(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> No
     if x_scale == "log":
         ax.legend(loc="lower right", markerfirst=False)
 
-    save_figure(ax, f"period_cdf_with_ttv_flag_{x_scale}.pdf")
+    save_figure(ax, f"period_cdf_with_ttv_flag_{x_scale}.pdf", pdf=pdf)
 
 
 def fraction_of_transiting_companions(
-    ax: Axes, data: KeplerData, *, large_planet_cutoff: float = 5.0
+    ax: Axes,
+    data: KeplerData,
+    *,
+    large_planet_cutoff: float = 5.0,
+    pdf: PdfPages | None = None,
 ) -> None:
     """For each period in our dataset, find the fraction of candidates with a transit companion.
 
@@ -234,42 +302,43 @@ def fraction_of_transiting_companions(
     None
     """
 
-    def fraction_of_neighbours(filtered_period, companion_filter) -> float:
-        if any(filtered_period):
-            return sum(filtered_period & companion_filter) / sum(filtered_period)
-
-        return 0.0
-
-    df = data.all_candidates.sort_values(by="ttvperiod")
-    period = df["ttvperiod"]
+    # only the columns used below are put in period order rather than the whole dataframe
+    df = data.all_candidates
+    order = np.argsort(df["ttvperiod"].to_numpy())
+    sorted_period = df["ttvperiod"].to_numpy()[order]
 
     # if you are in the middle/outermost position, you have at least one planet with a smaller orbit
     # if you are in the innermost/middle position, you have at least one planet with a larger orbit
-    have_inner_companions = df["position"].isin(["middle", "outermost"])
-    have_outer_companions = df["position"].isin(["innermost", "middle"])
+    position = position_codes(df)[order]
+    have_inner_companions = (position == POSITION.MIDDLE) | (
+        position == POSITION.OUTERMOST
+    )
+    have_outer_companions = (position == POSITION.INNERMOST) | (
+        position == POSITION.MIDDLE
+    )
 
-    large_planets = df["radius"] > large_planet_cutoff
-    logging.log(logging.INFO, f"Large planets have R > {large_planet_cutoff} R_earth")
+    large_planets = (df["radius"].to_numpy() > large_planet_cutoff)[order]
+    logging.log(logging.INFO, "Large planets have R > %s R_earth", large_planet_cutoff)
+
+    all_planets = np.ones(len(df), dtype=bool)
 
     # find planets that have period smaller/larger than a given period
     # of those planets, find the fraction that also have a transiting companion
-    inner_companions = [
-        fraction_of_neighbours(period < p, have_inner_companions) for p in period
-    ]
-    outer_companions = [
-        fraction_of_neighbours(period > p, have_outer_companions) for p in period
-    ]
+    inner_companions = _fraction_with_companions(
+        sorted_period, all_planets, have_inner_companions, side="inner"
+    )
+    outer_companions = _fraction_with_companions(
+        sorted_period, all_planets, have_outer_companions, side="outer"
+    )
 
     # find large planets that have period smaller/larger than a given period
     # of those planets, find the fraction that also have a transiting companion
-    large_inner_companions = [
-        fraction_of_neighbours(large_planets & (period < p), have_inner_companions)
-        for p in period
-    ]
-    large_outer_companions = [
-        fraction_of_neighbours(large_planets & (period > p), have_outer_companions)
-        for p in period
-    ]
+    large_inner_companions = _fraction_with_companions(
+        sorted_period, large_planets, have_inner_companions, side="inner"
+    )
+    large_outer_companions = _fraction_with_companions(
+        sorted_period, large_planets, have_outer_companions, side="outer"
+    )
 
     # define plot formatting for each line
     plot_properties = (
@@ -308,11 +377,63 @@ def fraction_of_transiting_companions(
     )
 
     for line_data, plot_format in plot_properties:
-        ax.plot(period, line_data, **plot_format)
+        ax.plot(sorted_period, line_data, **plot_format)
 
     ax.set_xscale("log")
     ax.set_xlabel("Period [days]")
     ax.set_ylabel("Cumulative Fraction")
     ax.legend(loc="center left", bbox_to_anchor=(0, 0.6))
 
-    save_figure(ax, "fraction_of_transiting_companions.pdf")
+    save_figure(ax, "fraction_of_transiting_companions.pdf", pdf=pdf)
+
+
+def _fraction_with_companions(
+    sorted_period: NDArray[np.float64],
+    population: NDArray[np.bool_],
+    have_companions: NDArray[np.bool_],
+    *,
+    side: str,
+) -> NDArray[np.float64]:
+    """For each period p, find the fraction of the population with period < p (side="inner") or period > p (side="outer") that have a transiting companion.
+
+    The periods must be sorted in ascending order so that the planets with period < p (period > p) form a prefix (suffix) of the arrays. The counts are then read off cumulative sums instead of masking the full arrays once per period.
+
+    Parameters
+    ----------
+    sorted_period : numpy.ndarray
+        Periods sorted in ascending order.
+    population : numpy.ndarray
+        Boolean mask of the planets to consider.
+    have_companions : numpy.ndarray
+        Boolean mask of the planets with a transiting companion.
+    side : str
+        "inner" to consider planets with a smaller period, "outer" for planets with a larger period.
+
+    Returns
+    -------
+    numpy.ndarray
+        Fraction of planets with a transiting companion for each period. Periods with no planets on the requested side have a fraction of 0.
+    """
+
+    def count(mask: NDArray[np.bool_]) -> NDArray[np.int64]:
+        # cumulative[i] is the number of planets in mask with index < i
+        cumulative = np.concatenate(([0], np.cumsum(mask)))
+
+        if side == "inner":
+            # planets with period < p come before the first occurrence of p
+            idx = np.searchsorted(sorted_period, sorted_period, side="left")
+            return cumulative[idx]
+
+        # planets with period > p come after the last occurrence of p
+        idx = np.searchsorted(sorted_period, sorted_period, side="right")
+        return cumulative[-1] - cumulative[idx]
+
+    num_planets = count(population)
+    num_with_companions = count(population & have_companions)
+
+    return np.divide(
+        num_with_companions,
+        num_planets,
+        out=np.zeros(len(sorted_period)),
+        where=num_planets > 0,
+    )
@@ -1,9 +1,12 @@
 import logging
 from functools import partial
 
+import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_pdf import PdfPages
+from numpy.typing import NDArray
 
 from architectures_2023.data import KeplerData
 from architectures_2023.visual import PLOT_FORMAT, cdf, save_figure
@@ -11,48 +14,52 @@ from architectures_2023.visual import PLOT_FORMAT, cdf, save_figure
 __all__ = ["generate_figures", "generate_mono_transit_figures"]
 
 
-def generate_figures(kepler: KeplerData):
+def generate_figures(kepler: KeplerData, *, pdf: PdfPages | None = None):
     logging.log(
-        logging.INFO, f"Generating figures for radius related data with\n{kepler}"
+        logging.INFO, "Generating figures for radius related data with\n%s", kepler
     )
 
     ax = plt.subplot()
 
     cdf_impact_param_over_radii_subsets(
-        ax, kepler, large_planet_cutoff=5, normalize_at_x=1.0
+        ax, kepler, large_planet_cutoff=5, normalize_at_x=1.0, pdf=pdf
     )
 
     cdf_population_period_with_radius_subsets(
-        ax, kepler, radius_bins=[0, 1.8, 5, 10, 1e12], b_cutoff=0.95
+        ax, kepler, radius_bins=[0, 1.8, 5, 10, 1e12], b_cutoff=0.95, pdf=pdf
     )
 
 
-def generate_mono_transit_figures(kepler: KeplerData) -> None:
+def generate_mono_transit_figures(
+    kepler: KeplerData, *, pdf: PdfPages | None = None
+) -> None:
     logging.log(
-        logging.INFO, f"Generating figures for radius related data with\n{kepler}"
+        logging.INFO, "Generating figures for radius related data with\n%s", kepler
     )
 
     ax = plt.subplot()
 
-    cdf_radii_of_population_subsets(ax, kepler, b_cutoff=0.95, normalize_at_x=5)
+    # the radii figures share the impact parameter restriction so it's only applied once
+    b_cutoff = 0.95
+    logging.log(logging.INFO, "Additional restriction: b + b_ep < %s", b_cutoff)
+    kepler_low_b = kepler.subset(partial(_impact_param_below, b_cutoff=b_cutoff))
+
+    cdf_radii_of_population_subsets(ax, kepler_low_b, normalize_at_x=5, pdf=pdf)
 
     cdf_impact_param_over_radii_subsets(
-        ax, kepler, large_planet_cutoff=5, normalize_at_x=1.0
+        ax, kepler, large_planet_cutoff=5, normalize_at_x=1.0, pdf=pdf
     )
 
-    long_period_singles = partial(
-        cdf_radii_of_long_period_singles,
-        ax,
-        kepler,
-        b_cutoff=0.95,
-        long_period_cutoff=10,
-        normalize_at_x=10,
-        x_scale="linear",
-    )
-    long_period_singles(large_planet_cutoff=3)
-    long_period_singles(large_planet_cutoff=4)
-    long_period_singles(large_planet_cutoff=4.5)
-    long_period_singles(large_planet_cutoff=5)
+    for large_planet_cutoff in (3, 4, 4.5, 5):
+        cdf_radii_of_long_period_singles(
+            ax,
+            kepler_low_b,
+            large_planet_cutoff=large_planet_cutoff,
+            long_period_cutoff=10,
+            normalize_at_x=10,
+            x_scale="linear",
+            pdf=pdf,
+        )
 
 
 def cdf_impact_param_over_radii_subsets(
@@ -61,52 +68,53 @@ def cdf_impact_param_over_radii_subsets(
     *,
     large_planet_cutoff: float = 5.0,
     normalize_at_x: float = 1.0,
+    pdf: PdfPages | None = None,
 ) -> None:
     radius_cutoff_label = rf"$R_p < {large_planet_cutoff}$ " r"R$_\oplus$"
 
     plot_cdf = partial(cdf, ax, normalize_at_x=normalize_at_x)
 
+    singles_b = data.singles["b"].to_numpy()
+    multis_b = data.multis["b"].to_numpy()
+
     fmt = PLOT_FORMAT["SINGLES"].copy()
     fmt["label"] = f"{fmt['label']}: {radius_cutoff_label}"
-    plot_cdf(data.singles.query("radius < @large_planet_cutoff")["b"], **fmt)
+    plot_cdf(singles_b[data.singles_radius < large_planet_cutoff], **fmt)
 
     fmt["label"] = fmt["label"].replace("<", r"\geq")
     fmt["linestyle"] = "dashed"
-    plot_cdf(data.singles.query("radius >= @large_planet_cutoff")["b"], **fmt)
+    plot_cdf(singles_b[data.singles_radius >= large_planet_cutoff], **fmt)
 
     fmt = PLOT_FORMAT["MULTIS"].copy()
     fmt["label"] = rf"{fmt['label']}: {radius_cutoff_label}"
-    plot_cdf(data.multis.query("radius < @large_planet_cutoff")["b"], **fmt)
+    plot_cdf(multis_b[data.multis_radius < large_planet_cutoff], **fmt)
 
     fmt["label"] = fmt["label"].replace("<", r"\geq")
     fmt["linestyle"] = "dashed"
-    plot_cdf(data.multis.query("radius >= @large_planet_cutoff")["b"], **fmt)
+    plot_cdf(multis_b[data.multis_radius >= large_planet_cutoff], **fmt)
 
     ax.set_xlabel(r"Impact Parameter [$b$]")
     ax.set_ylabel(f"CDF normalized at $b = {normalize_at_x}$")
     ax.legend(loc="lower right", markerfirst=False)
 
-    save_figure(ax, f"radius_w_mono_cdf_impact_param_over_radii_subsets.pdf")
+    save_figure(ax, f"radius_w_mono_cdf_impact_param_over_radii_subsets.pdf", pdf=pdf)
 
 
 def cdf_radii_of_population_subsets(
     ax: Axes,
     data: KeplerData,
     *,
-    b_cutoff: float = 0.95,
     normalize_at_x: float = 1.0,
     x_scale: str = "log",
+    pdf: PdfPages | None = None,
 ) -> None:
-    logging.log(logging.INFO, f"Additional restriction: b + b_ep < {b_cutoff}")
-    df = KeplerData(
-        data.singles.query("b + b_ep < @b_cutoff"),
-        data.multis.query("b + b_ep < @b_cutoff"),
-        status_flag=data.status_flag,
-    )
-
+    # data is expected to be restricted to candidates with b + b_ep < b_cutoff
     plot_group = (
-        {"SINGLES": df.singles["radius"], "MULTIS": df.multis["radius"]},
-        {"M2": df.m2["radius"], "M3_PLUS": df.m3_plus["radius"]},
+        {"SINGLES": data.singles_radius, "MULTIS": data.multis_radius},
+        {
+            "M2": data.m2["radius"].to_numpy(),
+            "M3_PLUS": data.m3_plus["radius"].to_numpy(),
+        },
     )
 
     for group in plot_group:
@@ -127,7 +135,9 @@ def cdf_radii_of_population_subsets(
         ax.set_ylim(-0.01, 1.21)
 
         save_figure(
-            ax, f"radius_w_mono_cdf_{'_'.join(group.keys()).lower()}_{x_scale}.pdf"
+            ax,
+            f"radius_w_mono_cdf_{'_'.join(group.keys()).lower()}_{x_scale}.pdf",
+            pdf=pdf,
         )
 
 
@@ -137,25 +147,26 @@ def cdf_radii_of_long_period_singles(
     *,
     normalize_at_x: float = 1.0,
     x_scale: str = "log",
-    b_cutoff: float = 0.95,
     large_planet_cutoff: float = 5.0,
     long_period_cutoff: float = 10.0,
     x_lim: tuple[float, float] = (0.08, 25),
     y_lim: tuple[float, float] = (-0.01, 1.21),
+    pdf: PdfPages | None = None,
 ) -> None:
+    # data is expected to be restricted to candidates with b + b_ep < b_cutoff so only
+    # the radius cut depends on the arguments
     logging.log(
-        logging.INFO,
-        f"Additional restriction: b + b_ep < {b_cutoff} and radius > {large_planet_cutoff}",
-    )
-    df = KeplerData(
-        data.singles.query("(b + b_ep < @b_cutoff) & (radius > @large_planet_cutoff)"),
-        data.multis.query("(b + b_ep < @b_cutoff) & (radius > @large_planet_cutoff)"),
-        status_flag=data.status_flag,
+        logging.INFO, "Additional restriction: radius > %s", large_planet_cutoff
     )
 
+    # only the radii (and the singles' periods) are plotted so the cuts are applied to
+    # the cached arrays instead of building filtered dataframes for every cutoff
+    large_singles = data.singles_radius > large_planet_cutoff
+    large_multis = data.multis_radius > large_planet_cutoff
+
     cdf(
         ax,
-        df.singles["radius"],
+        data.singles_radius[large_singles],
         normalize_at_x=normalize_at_x,
         start_cdf_at=large_planet_cutoff,
         include_zero=(x_scale == "linear"),
@@ -163,7 +174,7 @@ def cdf_radii_of_long_period_singles(
     )
     cdf(
         ax,
-        df.multis["radius"],
+        data.multis_radius[large_multis],
         normalize_at_x=normalize_at_x,
         start_cdf_at=large_planet_cutoff,
         include_zero=(x_scale == "linear"),
@@ -171,7 +182,7 @@ def cdf_radii_of_long_period_singles(
     )
 
     logging.log(
-        logging.INFO, f"Long period planets have period > {long_period_cutoff} days"
+        logging.INFO, "Long period planets have period > %s days", long_period_cutoff
     )
     fmt = PLOT_FORMAT["SINGLES"].copy()
     fmt["label"] = rf"{fmt['label']} $(|P| \geq {long_period_cutoff}$ days$)$"
@@ -179,7 +190,9 @@ def cdf_radii_of_long_period_singles(
     fmt["linestyle"] = "dashed"
     cdf(
         ax,
-        df.singles.query("abs(ttvperiod) > @long_period_cutoff")["radius"],
+        data.singles_radius[
+            large_singles & (np.abs(data.singles_period) > long_period_cutoff)
+        ],
         normalize_at_x=normalize_at_x,
         start_cdf_at=large_planet_cutoff,
         include_zero=(x_scale == "linear"),
@@ -200,6 +213,7 @@ def cdf_radii_of_long_period_singles(
         "radius_w_mono_cdf_long_period_singles_gt_"
         f"{str(large_planet_cutoff).replace('.', '_')}"
         f"REarth_{x_scale}.pdf",
+        pdf=pdf,
     )
 
 
@@ -210,21 +224,14 @@ def cdf_population_period_with_radius_subsets(
     radius_bins: list[float],
     b_cutoff: float = 0.95,
     x_scale: str = "log",
+    pdf: PdfPages | None = None,
 ) -> None:
-    logging.log(logging.INFO, f"Additional restriction: b + b_ep < {b_cutoff}")
-    df = KeplerData(
-        data.singles.query("b + b_ep < @b_cutoff"),
-        data.multis.query("b + b_ep < @b_cutoff"),
-        status_flag=data.status_flag,
-    )
+    logging.log(logging.INFO, "Additional restriction: b + b_ep < %s", b_cutoff)
+    df = data.subset(partial(_impact_param_below, b_cutoff=b_cutoff))
 
     # get the bin indices (based on radius) for each planet
-    singles_bins = pd.cut(
-        df.singles["radius"], bins=radius_bins, include_lowest=True, labels=False
-    )
-    multis_bins = pd.cut(
-        df.multis["radius"], bins=radius_bins, include_lowest=True, labels=False
-    )
+    singles_bins = _radius_bin_index(df.singles_radius, radius_bins)
+    multis_bins = _radius_bin_index(df.multis_radius, radius_bins)
 
     # this plot requires special formatting for the legend and the lines which
     # the label formatting will be taken care of in the for loop
@@ -245,13 +252,13 @@ def cdf_population_period_with_radius_subsets(
 
         cdf(
             ax,
-            df.singles[singles_bins == bin_idx]["ttvperiod"],
+            df.singles_period[singles_bins == bin_idx],
             include_zero=(x_scale == "linear"),
             **PLOT_FORMAT["SINGLES"] | fmt,
         )
         cdf(
             ax,
-            df.multis[multis_bins == bin_idx]["ttvperiod"],
+            df.multis_period[multis_bins == bin_idx],
             include_zero=(x_scale == "linear"),
             **PLOT_FORMAT["MULTIS"] | fmt,
         )
@@ -282,4 +289,37 @@ def cdf_population_period_with_radius_subsets(
     )
     ax.add_artist(upper_left)
 
-    save_figure(ax, f"radius_cdf_population_period_with_radius_subsets_{x_scale}.pdf")
+    save_figure(
+        ax, f"radius_cdf_population_period_with_radius_subsets_{x_scale}.pdf", pdf=pdf
+    )
+
+
+def _impact_param_below(df: pd.DataFrame, b_cutoff: float) -> NDArray[np.bool_]:
+    # equivalent to df.query("b + b_ep < @b_cutoff") without the expression parsing
+    return df["b"].to_numpy() + df["b_ep"].to_numpy() < b_cutoff
+
+
+def _radius_bin_index(
+    radius: NDArray[np.float64], bins: list[float]
+) -> NDArray[np.intp]:
+    """Find the bin of each radius, same as pd.cut(radius, bins, include_lowest=True, labels=False).
+
+    Parameters
+    ----------
+    radius : numpy.ndarray
+        Radii to bin.
+    bins : list[float]
+        Monotonically increasing bin edges. The bins are closed on the right and the first bin also includes its left edge.
+
+    Returns
+    -------
+    numpy.ndarray
+        Bin index of each radius. Radii outside of the bins (or NaN) get an index of -1 or len(bins) - 1, which matches no bin.
+    """
+    edges = np.asarray(bins)
+
+    # bin i is (edges[i], edges[i + 1]] so the left insertion point is one past the bin
+    bin_index = np.searchsorted(edges, radius, side="left") - 1
+    bin_index[radius == edges[0]] = 0
+
+    return bin_index
@@ -3,56 +3,70 @@ import logging
 import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_pdf import PdfPages
+from numpy.typing import NDArray
 
 from architectures_2023.data import KeplerData
 from architectures_2023.visual import PLOT_FORMAT, save_figure
 
 __all__ = ["generate_mono_transit_figures"]
 
+# Plot formats of the histograms, resolved once so the shared PLOT_FORMAT entries are
+# never modified by the figures
+_SINGLES_FORMAT = PLOT_FORMAT["SINGLES"] | {"label": "Singles"}
+_MULTIS_FORMAT = PLOT_FORMAT["MULTIS"] | {"label": "Multis"}
+_SYSTEMS_OF_MULTIS_FORMAT = PLOT_FORMAT["MULTIS"] | {"label": "Systems of Multis"}
+_MULTIS_DASHED_FORMAT = PLOT_FORMAT["MULTIS"] | {"linewidth": 1, "linestyle": "dashed"}
+_WEAKEST_SNR_IN_MULTIS_FORMAT = _MULTIS_DASHED_FORMAT | {
+    "label": "Weakest S/N in Multis"
+}
+_PCS_IN_MULTIS_FORMAT = _MULTIS_DASHED_FORMAT | {"label": "PCs in Multis"}
 
-def generate_mono_transit_figures(kepler: KeplerData):
+# the Kepler magnitude bins are fixed while the S/N bins depend on the range of the data
+_KEPMAG_BINS = np.arange(6.5, 18, 0.5)
+
+
+def generate_mono_transit_figures(kepler: KeplerData, *, pdf: PdfPages | None = None):
     ax = plt.subplot()
 
     logging.log(
-        logging.INFO, f"Generating figures for SNR related data with:\n{kepler}"
+        logging.INFO, "Generating figures for SNR related data with:\n%s", kepler
     )
 
-    counts_of_snr(ax, kepler, x_scale="log")
-    counts_of_kepler_mag(ax, kepler, y_scale="log")
-
-
-def counts_of_snr(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> None:
-    bins = 10 ** np.arange(
-        np.log10(int(data.all_candidates["snr"].min())),
-        np.log10(int(data.all_candidates["snr"].max())),
+    counts_of_snr(ax, kepler, x_scale="log", pdf=pdf)
+    counts_of_kepler_mag(ax, kepler, y_scale="log", pdf=pdf)
+
+
+def counts_of_snr(
+    ax: Axes, data: KeplerData, *, x_scale: str = "log", pdf: PdfPages | None = None
+) -> None:
+    # the extremes of all candidates are those of the singles and multis combined, so
+    # there is no need to concatenate them; the multis may be empty once filtered and
+    # S/N may be missing when it is not filtered on, so NaN is skipped
+    singles_snr = data.singles["snr"].to_numpy()
+    multis_snr = data.multis["snr"].to_numpy()
+    populations = [snr for snr in (singles_snr, multis_snr) if not np.isnan(snr).all()]
+    log_edges = np.arange(
+        np.log10(int(min(np.nanmin(snr) for snr in populations))),
+        np.log10(int(max(np.nanmax(snr) for snr in populations))),
         0.029,
         # 0.032,
         # 0.045,
     )
+    bins = 10**log_edges
 
-    ax.hist(
-        data.singles["snr"],
-        bins=bins.data,
-        histtype="step",
-        **PLOT_FORMAT["SINGLES"] | {"label": "Singles"},
-    )
-    ax.hist(
-        data.multis["snr"],
-        bins=bins.data,
-        histtype="step",
-        **PLOT_FORMAT["MULTIS"] | {"label": "Multis"},
-    )
+    # the bins are uniform in log10(S/N) so the counts are binned in log space
+    def plot_hist(snr: NDArray[np.float64], **fmt) -> None:
+        _plot_uniform_hist(ax, np.log10(snr), log_edges, bins=bins, **fmt)
 
-    fmt = PLOT_FORMAT["MULTIS"].copy()
-    fmt["linewidth"] = 1
-    fmt["linestyle"] = "dashed"
-    fmt["label"] = f"Weakest S/N in Multis"
-    ax.hist(
-        data.multis.groupby("system")["snr"].min(),
-        bins=bins.data,
-        histtype="step",
-        **fmt,
-    )
+    plot_hist(singles_snr, **_SINGLES_FORMAT)
+    if not data.multis.empty:
+        plot_hist(multis_snr, **_MULTIS_FORMAT)
+
+        # with one planet per system the weakest S/N would repeat the multis
+        weakest_snr = data.multis_by_system["snr"].to_numpy()
+        if len(weakest_snr) < len(multis_snr):
+            plot_hist(weakest_snr, **_WEAKEST_SNR_IN_MULTIS_FORMAT)
 
     ax.set_xscale(x_scale)  # type: ignore
     ax.set_xlabel("S/N")
@@ -60,37 +74,70 @@ def counts_of_snr(ax: Axes, data: KeplerData, *, x_scale: str = "log") -> None:
     ax.set_xlim(5, 1000)
 
     ax.legend(loc="upper right", markerfirst=False)
-    save_figure(ax, f"snr_hist_counts_{x_scale}.pdf")
-
+    save_figure(ax, f"snr_hist_counts_{x_scale}.pdf", pdf=pdf)
 
-def counts_of_kepler_mag(ax: Axes, data: KeplerData, *, y_scale: str = "log") -> None:
-    bins = np.arange(6.5, 18, 0.5)
 
-    ax.hist(
-        data.singles["kepmag"],
-        bins=bins.data,
-        histtype="step",
-        **PLOT_FORMAT["SINGLES"] | {"label": "Singles"},
+def counts_of_kepler_mag(
+    ax: Axes, data: KeplerData, *, y_scale: str = "log", pdf: PdfPages | None = None
+) -> None:
+    _plot_uniform_hist(
+        ax, data.singles["kepmag"].to_numpy(), _KEPMAG_BINS, **_SINGLES_FORMAT
     )
-
-    fmt = PLOT_FORMAT["MULTIS"].copy()
-    ax.hist(
-        data.multis.groupby("system")["kepmag"].first(),
-        bins=bins.data,
-        histtype="step",
-        **fmt | {"label": f"Systems of Multis"},
-    )
-
-    fmt["linewidth"] = 1
-    fmt["linestyle"] = "dashed"
-    fmt["label"] = f"PCs in Multis"
-    ax.hist(data.multis["kepmag"], bins=bins.data, histtype="step", **fmt)
+    if not data.multis.empty:
+        _plot_uniform_hist(
+            ax,
+            data.multis_by_system["kepmag"].to_numpy(),
+            _KEPMAG_BINS,
+            **_SYSTEMS_OF_MULTIS_FORMAT,
+        )
+        _plot_uniform_hist(
+            ax, data.multis["kepmag"].to_numpy(), _KEPMAG_BINS, **_PCS_IN_MULTIS_FORMAT
+        )
 
     ax.set_yscale(y_scale)  # type: ignore
-    ax.set_xlabel(r"\textit{Kepler} Magnitude of Host Star")
+    ax.set_xlabel(r"$\mathit{Kepler}$ Magnitude of Host Star")
     ax.set_ylabel("Number of Planet Candidates")
 
     ax.set_xlim(left=7.5)
 
     ax.legend(loc="upper left")
-    save_figure(ax, f"snr_hist_kepler_mag_counts.pdf")
+    save_figure(ax, f"snr_hist_kepler_mag_counts.pdf", pdf=pdf)
+
+
+def _plot_uniform_hist(
+    ax: Axes,
+    values: NDArray[np.float64],
+    edges: NDArray[np.float64],
+    *,
+    bins: NDArray[np.float64] | None = None,
+    **kwargs,
+) -> None:
+    """Plot a step histogram of values over equal-width bins.
+
+    The counts are computed with np.histogram given the number of bins and their range
+    so numpy can index the bins arithmetically instead of searching the edges. The
+    counts are then drawn by ax.hist as weights on the left edge of each bin, which
+    gives the same outline as histogramming the values directly.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axes to plot the histogram on.
+    values : numpy.ndarray
+        The values to bin.
+    edges : numpy.ndarray
+        Equally spaced bin edges in the same space as values.
+    bins : numpy.ndarray, optional
+        The bin edges to draw, e.g. 10**edges when values are log10 of the data. The
+        edges are drawn if not provided.
+    **kwargs
+        Additional keyword arguments to pass to matplotlib.axes.Axes.hist.
+
+    Returns
+    -------
+    None
+    """
+    counts, _ = np.histogram(values, bins=len(edges) - 1, range=(edges[0], edges[-1]))
+
+    bins = edges if bins is None else bins
+    ax.hist(bins[:-1], bins=bins, weights=counts, histtype="step", **kwargs)
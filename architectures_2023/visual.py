@@ -5,6 +5,7 @@ import matplotlib as mpl
 import numpy as np
 import pandas as pd
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_pdf import PdfPages
 from matplotlib.lines import Line2D
 from numpy.typing import NDArray
 
@@ -18,6 +19,7 @@ def cdf(
     normalize_at_x: float | None = None,
     start_cdf_at: float = 0.0,
     include_zero: bool = True,
+    presorted: bool = False,
     **kwargs,
 ) -> Line2D:
     """Plot the cumulative distribution function of the data.
@@ -30,6 +32,8 @@ def cdf(
         The data to plot the cdf of.
     normalize_at_x : float, optional
         The x-value to normalize the cdf at. If not provided, the cdf will be normalized at the last x-value.
+    presorted : bool, optional
+        Whether the data is already sorted in ascending order, in which case it is not sorted again.
     **kwargs
         Additional keyword arguments to pass to matplotlib.axes.Axes.plot.
 
@@ -39,16 +43,26 @@ def cdf(
         The axes the cdf was plotted on.
     """
 
-    x = np.sort(data)
-    y = np.arange(1, len(x) + 1)
+    x = np.asarray(data) if presorted else np.sort(data)
 
     if include_zero:
-        x = np.insert(x, 0, start_cdf_at)
-        y = np.insert(y, 0, 0)
+        # prepend the starting point to a preallocated buffer instead of np.insert-ing
+        # into both x and y, which copies each of them once more
+        x_with_start = np.empty(len(x) + 1, dtype=x.dtype)
+        x_with_start[0] = start_cdf_at
+        x_with_start[1:] = x
+        x = x_with_start
+        y = np.arange(len(x))
+    else:
+        y = np.arange(1, len(x) + 1)
 
     # normalize the cdf w.r.t normalize_at_x if provided else
     # normalize at the last x value
-    normalize_idx = np.argmax(x >= normalize_at_x) if normalize_at_x else -1
+    normalize_idx = (
+        _first_at_or_above(x, normalize_at_x, include_zero)
+        if normalize_at_x is not None
+        else -1
+    )
     y = y / y[normalize_idx]
 
     kwargs["label"] = kwargs["label"].format(len(data)) if "label" in kwargs else None
@@ -57,7 +71,25 @@ def cdf(
     return line_plot
 
 
-def save_figure(ax: Axes, filename: str, dpi: int = 300) -> None:
+def _first_at_or_above(x: NDArray, value: float, include_zero: bool) -> int:
+    """Index of the first element of x that is >= value, same as np.argmax(x >= value).
+
+    x is sorted except for the starting point prepended when include_zero is set, so a
+    binary search replaces the full scan over x. If no element is >= value the index is
+    0, like np.argmax of an all False array.
+    """
+    if include_zero and x[0] >= value:
+        return 0
+
+    offset = int(include_zero)
+    idx = offset + int(np.searchsorted(x[offset:], value, side="left"))
+
+    return idx if idx < len(x) else 0
+
+
+def save_figure(
+    ax: Axes, filename: str, dpi: int = 300, *, pdf: PdfPages | None = None
+) -> None:
     """Save a matplotlib figure.
 
     Parameters
@@ -65,16 +97,24 @@ def save_figure(ax: Axes, filename: str, dpi: int = 300) -> None:
     ax : matplotlib.axes.Axes
         The axes we want to save the figure from.
     filename : str
-        The filename to save the figure to.
+        The filename to save the figure to. When collecting into pdf, the page is
+        labeled with it instead.
     dpi : int, optional
         The resolution of the figure in dots per inch.
+    pdf : matplotlib.backends.backend_pdf.PdfPages, optional
+        Document to add the figure to as a page, so the fonts and other resources are
+        embedded once in the document instead of once per figure file.
 
     Returns
     -------
     None
     """
     ax.figure.tight_layout(pad=0.1)
-    ax.figure.savefig(filename, dpi=dpi)
+    if pdf is not None:
+        pdf.attach_note(filename)
+        pdf.savefig(ax.figure, dpi=dpi)
+    else:
+        ax.figure.savefig(filename, dpi=dpi)
     ax.clear()
 
 
@@ -86,7 +126,6 @@ mpl.rcParams.update(
         "xtick.labelsize": 12,
         "ytick.labelsize": 12,
         "legend.fontsize": 12,
-        "font.family": "serif",
         "mathtext.fontset": "cm",
         "font.family": "cmu serif",
         "legend.frameon": False,
@@ -1,7 +1,11 @@
+import copy
 import logging
+import os
+from contextlib import AbstractContextManager, nullcontext
 from datetime import datetime as dt
 
 import pandas as pd
+from matplotlib.backends.backend_pdf import PdfPages
 
 from architectures_2023 import data, period, radius, snr
 from joblib import Parallel, delayed
@@ -17,64 +21,84 @@ logging.basicConfig(
 )
 
 
-def period_related(df: pd.DataFrame):
+def figure_output(config: dict, name: str) -> AbstractContextManager[PdfPages | None]:
+    # figures are saved to their own files unless they are collected in a single PDF
+    if config.get("figures", {}).get("single_pdf", False):
+        return PdfPages(f"{name}.pdf")
+
+    return nullcontext()
+
+
+def period_related(df: pd.DataFrame, config: dict):
     logging.log(logging.INFO, "Loading and processing data for period-related figures.")
-    config = data.load_config()
     kepler_p = data.process_data(df, config, data.STATUS_FLAG.PERIOD_RELATED)
-    period.generate_figures(kepler_p)
+    with figure_output(config, "period_figures") as pdf:
+        period.generate_figures(kepler_p, pdf=pdf)
 
 
-def radius_related(df: pd.DataFrame):
+def radius_related(df: pd.DataFrame, config: dict):
     logging.log(logging.INFO, "Loading and processing data for radius-related figures.")
-    config = data.load_config()
     kepler_r = data.process_data(df, config, data.STATUS_FLAG.RADIUS_RELATED)
-    radius.generate_figures(kepler_r)
+    with figure_output(config, "radius_figures") as pdf:
+        radius.generate_figures(kepler_r, pdf=pdf)
 
 
-def mono_inclusive_radius_related(df: pd.DataFrame):
+def mono_inclusive_radius_related(df: pd.DataFrame, config: dict):
     logging.log(
         logging.INFO,
         "Loading and processing data for mono-inclusive, radius-related figures.",
     )
-    config = data.load_config()
+    # the config is shared with the other tasks so only a copy is modified
+    config = copy.deepcopy(config)
     logging.log(logging.INFO, "Config now allows negative period PCs.")
     config["data_filtering"]["min_ttvperiod"] = None
     kepler_monos_included_r = data.process_data(
         df, config, data.STATUS_FLAG.RADIUS_RELATED
     )
-    radius.generate_mono_transit_figures(kepler_monos_included_r)
+    with figure_output(config, "radius_w_mono_figures") as pdf:
+        radius.generate_mono_transit_figures(kepler_monos_included_r, pdf=pdf)
 
 
-def snr_related(df: pd.DataFrame):
+def snr_related(df: pd.DataFrame, config: dict):
     logging.log(
         logging.INFO,
         "Loading and processing data for mono-inclusive, snr-related figures.",
     )
-    config = data.load_config()
+    # the config is shared with the other tasks so only a copy is modified
+    config = copy.deepcopy(config)
     config["data_filtering"]["min_ttvperiod"] = None
     config["data_filtering"]["min_snr"] = None
     logging.log(logging.INFO, "Config now allows negative period PCs and all SNR.")
     kepler_monos_included_p = data.process_data(
         df, config, data.STATUS_FLAG.PERIOD_RELATED
     )
-    snr.generate_mono_transit_figures(kepler_monos_included_p)
+    with figure_output(config, "snr_figures") as pdf:
+        snr.generate_mono_transit_figures(kepler_monos_included_p, pdf=pdf)
 
 
 def main():
-    df, _ = data.load_data()
+    config = data.load_config()
+    df, _ = data.load_data(
+        use_float32=config["data_processing"]["use_float32"],
+        columns=config["data_processing"]["keep_columns"] or None,
+    )
 
     task = []
-    task.append(delayed(period_related)(df))
-    task.append(delayed(radius_related)(df))
+    task.append(delayed(period_related)(df, config))
+    task.append(delayed(radius_related)(df, config))
 
     # include negative period PCs
-    task.append(delayed(mono_inclusive_radius_related)(df))
+    task.append(delayed(mono_inclusive_radius_related)(df, config))
 
     # include negative period PCs and all SNR
-    task.append(delayed(snr_related)(df))
+    task.append(delayed(snr_related)(df, config))
+
+    # the figures are only saved to file so the workers, which inherit the environment,
+    # can skip any interactive backend unless one is explicitly requested
+    os.environ.setdefault("MPLBACKEND", "Agg")
 
     # Actually execute all the functions in parallel now
-    Parallel(n_jobs=4, verbose=20)(task)
+    Parallel(n_jobs=len(task), verbose=20)(task)
     logging.log(logging.INFO, f"{10 * '='} END OF RUN {10 * '='}")
 
 
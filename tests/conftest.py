@@ -17,6 +17,8 @@ def config():
             "data_processing": {
                 "pre_split_filtering": pre_split_filtering,
                 "demote_multis_to_singles": demote_multis,
+                "use_float32": False,
+                "keep_columns": [],
             },
             "data_filtering": {
                 "min_ttvperiod": 0,
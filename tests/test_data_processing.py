@@ -1,3 +1,9 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pytest
+
 from architectures_2023 import data
 
 
@@ -49,3 +55,108 @@ def test_process_data(test_data, config):
     # ensure singles are singles and multis are multis
     assert not kepler.singles.duplicated(keep=False).any()
     assert kepler.get_multis_system_with(num_planets=1).empty
+
+
+def test_str_match(test_data):
+    df, _ = test_data
+    pattern = re.compile(r"t?1\d{2}")
+
+    expected = df["ttvflag"].astype(str).str.match(pattern).to_numpy()
+
+    # categorical and plain string columns should give the same mask
+    assert (data.str_match(df["ttvflag"].astype("category"), pattern) == expected).all()
+    assert (data.str_match(df["ttvflag"].astype(str), pattern) == expected).all()
+
+
+def test_load_data_cache(config):
+    config = config(pre_split_filtering=False, demote_multis=True)
+    config["data_processing"]["use_float32"] = True
+    config["data_processing"]["keep_columns"] = data.load_config()["data_processing"][
+        "keep_columns"
+    ]
+
+    def load():
+        return data.load_data(
+            "tests/data/test_set.csv",
+            use_float32=config["data_processing"]["use_float32"],
+            columns=config["data_processing"]["keep_columns"] or None,
+        )
+
+    # the first load parses the CSV and caches it, the second reads the cache back
+    cache = Path(data.__file__).parent / "../data/processed/test_set_float32.parquet"
+    cache.unlink(missing_ok=True)
+    try:
+        parsed, _ = load()
+        cached, path = load()
+    finally:
+        cache.unlink(missing_ok=True)
+
+    assert Path(path).resolve() == cache.resolve()
+    assert list(cached.columns) == config["data_processing"]["keep_columns"]
+    assert cached.dtypes.equals(parsed.dtypes)
+    for column, datatype in cached.select_dtypes("float").dtypes.items():
+        assert datatype == ("float64" if column in data.FLOAT64_COLUMNS else "float32")
+
+    # the kept columns should be enough to process the data
+    kepler = data.process_data(cached, config, data.STATUS_FLAG.PERIOD_RELATED)
+    assert not kepler.multis.empty
+
+
+def test_sorted_values(test_data, config):
+    df, _ = test_data
+    config = config(pre_split_filtering=False, demote_multis=True)
+
+    kepler = data.process_data(df, config, data.STATUS_FLAG.RADIUS_RELATED)
+
+    # subsets of the multis are taken from the sorted multis instead of sorted again,
+    # which should not depend on the index of the multis being unique
+    duplicated_index = data.KeplerData(
+        kepler.singles, kepler.multis.set_axis(np.zeros(len(kepler.multis), dtype=int))
+    )
+    for subset in [
+        "singles",
+        "all_candidates",
+        "multis",
+        "m2",
+        "m3_plus",
+        "middle_multi",
+    ]:
+        expected = getattr(kepler, subset)["ttvperiod"].sort_values().to_numpy()
+        assert (kepler.sorted_values(subset) == expected).all()
+        assert (duplicated_index.sorted_values(subset) == expected).all()
+
+    with pytest.raises(ValueError):
+        kepler.sorted_values("not_a_subset")
+
+
+def test_position_codes(test_data, config):
+    df, _ = test_data
+    config = config(pre_split_filtering=False, demote_multis=True)
+
+    kepler = data.process_data(df, config, data.STATUS_FLAG.PERIOD_RELATED)
+    positions = kepler.all_candidates["position"]
+
+    # codes should agree with the labels, also when the column is a plain string
+    for frame in (
+        kepler.all_candidates,
+        kepler.all_candidates.astype({"position": str}),
+    ):
+        codes = data.position_codes(frame)
+        for position in data.POSITION:
+            assert ((codes == position) == (positions == position.name.lower())).all()
+
+
+def test_multis_by_system(test_data, config):
+    df, _ = test_data
+    config = config(pre_split_filtering=False, demote_multis=True)
+
+    kepler = data.process_data(df, config, data.STATUS_FLAG.PERIOD_RELATED)
+    expected = kepler.multis.groupby("system").agg(
+        snr=("snr", "min"), kepmag=("kepmag", "first")
+    )
+
+    # the slice based reduction should agree with the groupby, sorted or not
+    assert kepler.multis_by_system.sort_index().equals(expected)
+
+    shuffled = data.KeplerData(kepler.singles, kepler.multis.iloc[::-1])
+    assert shuffled.multis_by_system.sort_index().equals(expected)
@@ -0,0 +1,37 @@
+import numpy as np
+from architectures_2023 import period
+
+
+def test_fraction_with_companions():
+    rng = np.random.default_rng(42)
+
+    # include repeated periods to check the strict inequalities
+    sorted_period = np.sort(rng.choice(np.linspace(1, 100, 50), size=200))
+    population = rng.random(200) > 0.3
+    have_companions = rng.random(200) > 0.5
+
+    def fraction_of_neighbours(filtered_period) -> float:
+        if any(filtered_period):
+            return sum(filtered_period & have_companions) / sum(filtered_period)
+
+        return 0.0
+
+    inner = [
+        fraction_of_neighbours(population & (sorted_period < p)) for p in sorted_period
+    ]
+    outer = [
+        fraction_of_neighbours(population & (sorted_period > p)) for p in sorted_period
+    ]
+
+    np.testing.assert_allclose(
+        period._fraction_with_companions(
+            sorted_period, population, have_companions, side="inner"
+        ),
+        inner,
+    )
+    np.testing.assert_allclose(
+        period._fraction_with_companions(
+            sorted_period, population, have_companions, side="outer"
+        ),
+        outer,
+    )
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from architectures_2023 import radius as radius_module
+
+
+def test_radius_bin_index():
+    bins = [0, 1.8, 5, 10, 1e12]
+    radius = np.array([0, 0.5, 1.8, 1.80001, 5, 7.2, 10, 2e12, -1, np.nan])
+
+    expected = pd.cut(radius, bins=bins, include_lowest=True, labels=False)
+    bin_index = radius_module._radius_bin_index(radius, bins)
+
+    # out of range radii are NaN for pd.cut and shouldn't fall in any bin here
+    in_range = ~np.isnan(expected)
+    assert (bin_index[in_range] == expected[in_range]).all()
+    assert not np.isin(bin_index[~in_range], range(len(bins) - 1)).any()
@@ -0,0 +1,15 @@
+import numpy as np
+from architectures_2023 import visual
+
+
+def test_first_at_or_above():
+    rng = np.random.default_rng(42)
+    data = np.sort(rng.choice(np.linspace(0, 10, 20), size=100))
+
+    for include_zero, start in [(False, 0.0), (True, 0.0), (True, 5.0)]:
+        x = np.insert(data, 0, start) if include_zero else data
+
+        # includes values below, on, between and above the data points
+        for value in [-1.0, 0.0, 2.5, np.linspace(0, 10, 20)[7], 5.0, 10.0, 11.0]:
+            expected = np.argmax(x >= value)
+            assert visual._first_at_or_above(x, value, include_zero) == expected